@@ -1,12 +1,19 @@
 import os
+import sys
+import csv
+import re
 import time
+import ctypes
 from datetime import datetime
-from collections import deque
+from collections import deque, defaultdict
+from contextlib import contextmanager
 
 from colorama import init, Fore, Style
 from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.chart import BarChart, LineChart, Reference
+from openpyxl.formatting.rule import CellIsRule
 from tabulate import tabulate
 import msvcrt
 
@@ -14,16 +21,54 @@ import msvcrt
 init(autoreset=True)
 
 DB_FILENAME = "blood_management.xlsx"
+DASHBOARD_FILENAME = "blood_dashboard.xlsx"
+HISTORY_FILENAME = "blood_management_history.csv"
+HISTORY_HEADERS = ["ID", "Type", "Name", "Blood Type", "Units", "Action", "Date"]
 LOW_STOCK_THRESHOLD = 5
 MAX_BAR_LENGTH = 30
 DASHBOARD_REFRESH_SECONDS = 1
 HISTORY_LIMIT = 20
+ANIMATE_MESSAGES = os.environ.get("BMS_ANIMATE") == "1"
+CLEAR_SCREEN = "\x1b[H\x1b[2J"  # translated by colorama on older Windows consoles
 BLOOD_TYPES = ["A+", "A-", "B+", "B-", "AB+", "AB-", "O+", "O-"]
 
+# Shared style objects, built once instead of per cell
+_THIN = Side(style="thin")
+_BORDER = Border(left=_THIN, right=_THIN, top=_THIN, bottom=_THIN)
+_HEADER_FONT = Font(bold=True, color="FFFFFF")
+_HEADER_FILL = PatternFill("solid", fgColor="4F81BD")
+_TITLE_FONT = Font(bold=True, size=16, color="FFFFFF")
+_CENTER = Alignment(horizontal="center")
+_BOLD = Font(bold=True)
+# Conditional-format fills set both colours: Excel paints a solid fill in a
+# rule from bgColor (end_color), not fgColor
+_RED_FILL = PatternFill(start_color="FF0000", end_color="FF0000", fill_type="solid")
+_YELLOW_FILL = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
+
 donation_trend = deque(maxlen=HISTORY_LIMIT)
 usage_trend = deque(maxlen=HISTORY_LIMIT)
+_trend_head = 0  # number of values ever pushed to either trend
+_trend_lines = (None, "", "")  # (head, donations bar, usage bar) last rendered
+
+# Workbook of the open transaction, shared by every helper it calls
+_WB = None
+
+# Set by actions that change stock or daily totals; see refresh_excel_dashboard
+_DASHBOARD_DIRTY = True
+
+# In-memory state loaded once by load_state(); this program is the only writer
+STOCK = {}
+BLOOD_ROW = {}  # blood type -> its row in the BloodStock sheet
+NEXT_ID = {}
+DAILY = defaultdict(lambda: [0, 0])  # yyyymmdd int -> [units donated, units used]
 
 # ---------------------------- Banner ----------------------------
+def clear_screen():
+    # An escape sequence instead of spawning cmd.exe for "cls"
+    sys.stdout.write(CLEAR_SCREEN)
+    sys.stdout.flush()
+
+
 def print_banner():
     banner = r"""
   ____  _                 _     __  __                  _             
@@ -37,8 +82,17 @@ def print_banner():
 # ---------------------------- Excel Utilities ----------------------------
 def initialize_database():
     if os.path.exists(DB_FILENAME):
-        return
+        migrate_database()
+    else:
+        create_database()
 
+    if not os.path.exists(HISTORY_FILENAME):
+        # History is kept in its own CSV file so logging an action is a plain append
+        with open(HISTORY_FILENAME, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerow(HISTORY_HEADERS)
+
+
+def create_database():
     wb = Workbook()
 
     # Donors
@@ -59,133 +113,242 @@ def initialize_database():
         ws.append([b, 0])
     format_sheet(ws)
 
-    # History
-    ws = wb.create_sheet("History")
-    ws.append(["ID", "Type", "Name", "Blood Type", "Units", "Action", "Date"])
-    format_sheet(ws)
-
     wb.save(DB_FILENAME)
 
 
+def migrate_database():
+    wb = load_workbook(DB_FILENAME)
+    changed = False
+
+    if "Dashboard" in wb.sheetnames:
+        # Older databases embedded the dashboard; it now lives in DASHBOARD_FILENAME
+        del wb["Dashboard"]
+        changed = True
+
+    if "History" in wb.sheetnames and not os.path.exists(HISTORY_FILENAME):
+        # Older databases kept History as a sheet; move its rows to HISTORY_FILENAME
+        with open(HISTORY_FILENAME, "w", newline="", encoding="utf-8") as f:
+            csv.writer(f).writerows(wb["History"].iter_rows(values_only=True))
+        del wb["History"]
+        changed = True
+
+    if changed:
+        wb.save(DB_FILENAME)
+
+
 def format_sheet(ws):
     for col in ws.columns:
         ws.column_dimensions[col[0].column_letter].width = 20
 
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill("solid", fgColor="4F81BD")
-
     for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = Alignment(horizontal="center")
-
-    border = Border(left=Side(style="thin"), right=Side(style="thin"),
-                    top=Side(style="thin"), bottom=Side(style="thin"))
+        cell.font = _HEADER_FONT
+        cell.fill = _HEADER_FILL
+        cell.alignment = _CENTER
 
     for row in ws.iter_rows():
         for cell in row:
-            cell.border = border
+            cell.border = _BORDER
 
 
 def load_workbook_safe():
     return load_workbook(DB_FILENAME)
 
 
-def generate_id(sheet_name):
-    wb = load_workbook_safe()
-    ws = wb[sheet_name]
+def load_ro():
+    # Streaming parser for pure reads; callers must close() it so the file
+    # is not left locked for the next save
+    return load_workbook(DB_FILENAME, read_only=True, data_only=True)
+
+
+def read_sheet(sheet_name):
+    # Header and data rows of a sheet as value tuples
+    wb = load_ro()
+    try:
+        rows = wb[sheet_name].iter_rows(values_only=True)
+        return next(rows), list(rows)
+    finally:
+        wb.close()
+
+
+@contextmanager
+def transaction():
+    # Load the workbook once per CRUD action and save it once when the action
+    # succeeds; nested transactions join the outer one
+    global _WB
+    if _WB is not None:
+        yield _WB
+        return
+
+    _WB = load_workbook_safe()
+    try:
+        yield _WB
+        _WB.save(DB_FILENAME)
+    finally:
+        _WB = None
+
+
+def append_row(sheet_name, row, wb=None):
+    if wb is None:
+        with transaction() as wb:
+            return append_row(sheet_name, row, wb)
+
+    wb[sheet_name].append(row)
+
+
+def load_state():
+    wb = load_ro()
+
+    for idx, row in enumerate(wb["BloodStock"].iter_rows(min_row=2, values_only=True), start=2):
+        BLOOD_ROW[row[0]] = idx
+        try:
+            STOCK[row[0]] = int(row[1])
+        except:
+            STOCK[row[0]] = 0
+
+    for sheet_name in ("Donors", "Patients"):
+        NEXT_ID[sheet_name] = find_last_id(wb[sheet_name]) + 1
+
+    wb.close()
+
+    with open(HISTORY_FILENAME, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows)
+        aggregate_history(rows)
+
+
+def find_last_id(ws):
+    # IDs are handed out in increasing order and rows only appended, so the
+    # last row holds the highest one
+    last_row = ws.max_row or 1
+    last = next(ws.iter_rows(min_row=last_row, max_row=last_row, max_col=1, values_only=True))[0]
+    if last_row > 1 and str(last).isdigit():
+        return int(last)
+
+    # Header-only sheet, or trailing rows left behind by a manual edit
     last_id = 0
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
+    for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
         if row[0] and str(row[0]).isdigit():
             last_id = max(last_id, int(row[0]))
 
-    return last_id + 1
+    return last_id
+
+
+def aggregate_history(rows):
+    # Hot loop on long histories: unpack only the needed columns and route
+    # each row to its day's totals with a single dict lookup
+    column = {"Donor": 0, "Patient": 1}
+    daily = defaultdict(lambda: [0, 0])
+
+    for _, entity_type, _, _, units, _, timestamp in rows:
+        idx = column.get(entity_type)
+        if idx is not None:
+            daily[timestamp[:10]][idx] += int(units)
+
+    # Convert each distinct "YYYY-MM-DD" to its integer key once, not per row
+    for date, totals in daily.items():
+        DAILY[int(date.replace("-", ""))] = totals
+
+
+def day_key(dt):
+    return dt.year * 10000 + dt.month * 100 + dt.day
+
+
+def format_day_key(key):
+    return f"{key // 10000:04d}-{key // 100 % 100:02d}-{key % 100:02d}"
+
+
+def generate_id(sheet_name):
+    new_id = NEXT_ID[sheet_name]
+    NEXT_ID[sheet_name] = new_id + 1
+    return new_id
 
 # ---------------------------- Blood Stock & History ----------------------------
-def update_blood_stock(blood_type, units, action="add"):
-    wb = load_workbook_safe()
-    ws = wb["BloodStock"]
-
-    for row in ws.iter_rows(min_row=2):
-        if row[0].value == blood_type:
-            try:
-                current_units = int(row[1].value)
-            except:
-                current_units = 0
-
-            if action == "add":
-                row[1].value = current_units + units
-            elif action == "subtract":
-                row[1].value = max(0, current_units - units)
-            break
+def update_blood_stock(blood_type, units, action="add", wb=None):
+    if wb is None:
+        with transaction() as wb:
+            return update_blood_stock(blood_type, units, action, wb)
 
-    wb.save(DB_FILENAME)
+    if action == "add":
+        STOCK[blood_type] += units
+    elif action == "subtract":
+        STOCK[blood_type] = max(0, STOCK[blood_type] - units)
+
+    wb["BloodStock"].cell(row=BLOOD_ROW[blood_type], column=2, value=STOCK[blood_type])
 
 
 def log_history(entity_id, entity_type, name, blood_type, units, action):
-    wb = load_workbook_safe()
-    ws = wb["History"]
-
-    ws.append([
-        entity_id,
-        entity_type,
-        name,
-        blood_type,
-        units,
-        action,
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ])
-    wb.save(DB_FILENAME)
+    # A single appended line; the workbook is not touched
+    with open(HISTORY_FILENAME, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow([
+            entity_id,
+            entity_type,
+            name,
+            blood_type,
+            units,
+            action,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ])
+
+
+def read_history():
+    with open(HISTORY_FILENAME, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        return next(rows), list(rows)
 
 # ---------------------------- Excel Dashboard ----------------------------
-def update_excel_dashboard():
-    wb = load_workbook(DB_FILENAME)
+def refresh_excel_dashboard():
+    # Rebuild the dashboard file only when its data changed since the last build
+    global _DASHBOARD_DIRTY
+    if _DASHBOARD_DIRTY:
+        update_excel_dashboard()
+        _DASHBOARD_DIRTY = False
 
-    if "Dashboard" in wb.sheetnames:
-        del wb["Dashboard"]
 
-    ws_dash = wb.create_sheet("Dashboard")
+def stock_cell(ws, value):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.alignment = _CENTER
+    cell.font = _BOLD
+    return cell
+
+
+def update_excel_dashboard():
+    # The dashboard is streamed into its own file so refreshing the charts
+    # never re-serializes the Donors/Patients/History sheets
+    dash = Workbook(write_only=True)
+    ws_dash = dash.create_sheet("Dashboard")
+    ws_dash.freeze_panes = "A2"
 
     # Title
-    ws_dash.merge_cells("A1:E1")
-    title = ws_dash["A1"]
-    title.value = "BLOOD BANK DASHBOARD SUMMARY"
-    title.font = Font(bold=True, size=16, color="FFFFFF")
-    title.fill = PatternFill("solid", fgColor="4F81BD")
-    title.alignment = Alignment(horizontal="center")
+    title = WriteOnlyCell(ws_dash, value="BLOOD BANK DASHBOARD SUMMARY")
+    title.font = _TITLE_FONT
+    title.fill = _HEADER_FILL
+    title.alignment = _CENTER
+    ws_dash.append((title,))
 
     # Stock Table Header
-    ws_dash.append(["Blood Type", "Units Available"])
-
-    ws_stock = wb["BloodStock"]
+    ws_dash.append(("Blood Type", "Units Available"))
 
     # Add Data
-    for row in ws_stock.iter_rows(min_row=2, values_only=True):
-        ws_dash.append(list(row))
-
-    # Style + Fix: Convert to int first
-    for row in ws_dash.iter_rows(min_row=2, max_col=2):
-        try:
-            units = int(row[1].value)
-        except:
-            units = 0
-
-        for cell in row:
-            cell.alignment = Alignment(horizontal="center")
-            cell.font = Font(bold=True)
-
-        # Colors
-        if units <= LOW_STOCK_THRESHOLD:
-            row[1].fill = PatternFill("solid", fgColor="FF0000")  # Red
-        elif units <= LOW_STOCK_THRESHOLD * 2:
-            row[1].fill = PatternFill("solid", fgColor="FFFF00")  # Yellow
+    stock_rows = [(stock_cell(ws_dash, b), stock_cell(ws_dash, STOCK[b])) for b in BLOOD_TYPES]
+    for r in stock_rows:
+        ws_dash.append(r)
+    row_count = 2 + len(stock_rows)
+
+    # Colors, evaluated by Excel; the red rule has priority over the yellow one
+    stock_range = f"B3:B{row_count}"
+    ws_dash.conditional_formatting.add(stock_range, CellIsRule(
+        operator="lessThanOrEqual", formula=[str(LOW_STOCK_THRESHOLD)],
+        fill=_RED_FILL, stopIfTrue=True))
+    ws_dash.conditional_formatting.add(stock_range, CellIsRule(
+        operator="lessThanOrEqual", formula=[str(LOW_STOCK_THRESHOLD * 2)],
+        fill=_YELLOW_FILL))
 
     # Bar Chart
     chart = BarChart()
     chart.title = "Blood Stock by Type"
-    data = Reference(ws_dash, min_col=2, min_row=2, max_row=ws_stock.max_row + 1)
-    cats = Reference(ws_dash, min_col=1, min_row=3, max_row=ws_stock.max_row + 1)
+    data = Reference(ws_dash, min_col=2, min_row=2, max_row=row_count)
+    cats = Reference(ws_dash, min_col=1, min_row=3, max_row=row_count)
     chart.add_data(data, titles_from_data=False)
     chart.set_categories(cats)
     chart.height = 10
@@ -193,62 +356,72 @@ def update_excel_dashboard():
     ws_dash.add_chart(chart, "D3")
 
     # Donation vs Usage Table
-    ws_hist = wb["History"]
-    donations = {}
-    usage = {}
+    ws_dash.append(())
+    ws_dash.append(("Date", "Units Donated", "Units Used"))
+    start = row_count + 2
 
-    for row in ws_hist.iter_rows(min_row=2, values_only=True):
-        date = row[6][:10]
-        units = int(row[4])
-
-        if row[1] == "Donor":
-            donations[date] = donations.get(date, 0) + units
-        elif row[1] == "Patient":
-            usage[date] = usage.get(date, 0) + units
-
-    ws_dash.append([])
-    ws_dash.append(["Date", "Units Donated", "Units Used"])
-
-    start = ws_dash.max_row
-
-    for d in sorted(set(list(donations.keys()) + list(usage.keys()))):
-        ws_dash.append([d, donations.get(d, 0), usage.get(d, 0)])
+    day_rows = [(format_day_key(d), *DAILY[d]) for d in sorted(DAILY)]
+    for r in day_rows:
+        ws_dash.append(r)
+    row_count = start + len(day_rows)
 
     # Line Chart
     line = LineChart()
     line.title = "Daily Donations vs Usage"
-    data = Reference(ws_dash, min_col=2, min_row=start, max_col=3, max_row=ws_dash.max_row)
-    cats = Reference(ws_dash, min_col=1, min_row=start+1, max_row=ws_dash.max_row)
+    data = Reference(ws_dash, min_col=2, min_row=start, max_col=3, max_row=row_count)
+    cats = Reference(ws_dash, min_col=1, min_row=start+1, max_row=row_count)
     line.add_data(data, titles_from_data=True)
     line.set_categories(cats)
     line.height = 10
     line.width = 20
     ws_dash.add_chart(line, "E20")
 
-    ws_dash.freeze_panes = "A2"
+    # History, copied from HISTORY_FILENAME for viewing alongside the charts
+    ws_hist = dash.create_sheet("History")
+    ws_hist.append(tuple(HISTORY_HEADERS))
 
-    wb.save(DB_FILENAME)
+    with open(HISTORY_FILENAME, newline="", encoding="utf-8") as f:
+        rows = csv.reader(f)
+        next(rows)
+        for entity_id, entity_type, name, blood_type, units, action, date in rows:
+            ws_hist.append((int(entity_id), entity_type, name, blood_type, int(units), action, date))
+
+    dash.save(DASHBOARD_FILENAME)
 
 # ---------------------------- Console Dashboard ----------------------------
-def display_live_dashboard():
-    wb = load_workbook_safe()
-    ws = wb["BloodStock"]
+_BARS = ["█" * i for i in range(51)]
 
-    stock = {}
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        try:
-            stock[row[0]] = int(row[1])
-        except:
-            stock[row[0]] = 0
+def bar_string(length):
+    # Bars up to 50 cells come from the prebuilt table
+    return _BARS[length] if length < len(_BARS) else "█" * length
+
+
+def push_trend(trend, units):
+    global _trend_head
+    trend.append(units)
+    _trend_head += 1
+
+
+def render_trends():
+    # The trend bars only change when a value is pushed, not every frame
+    global _trend_lines
+    if _trend_lines[0] != _trend_head:
+        _trend_lines = (
+            _trend_head,
+            "".join(bar_string(x // 2) for x in donation_trend),
+            "".join(bar_string(x // 2) for x in usage_trend),
+        )
+    return _trend_lines[1:]
 
-    os.system('cls')
+
+def display_live_dashboard():
+    clear_screen()
     print_banner()
     print(Fore.CYAN + "=== Live Blood Stock Dashboard ===\n")
 
-    for b, u in stock.items():
-        bar_len = int(u * MAX_BAR_LENGTH / 50)
-        bar = "█" * bar_len
+    for b, u in STOCK.items():
+        bar = bar_string(int(u * MAX_BAR_LENGTH / 50))
 
         if u <= LOW_STOCK_THRESHOLD:
             color = Fore.RED
@@ -259,21 +432,31 @@ def display_live_dashboard():
 
         print(f"{b:>3}: {color}{bar} {u} units")
 
+    donations_bar, usage_bar = render_trends()
+
     print("\nTrend Graphs:")
-    print(Fore.MAGENTA + "Donations: " + "".join("█" * (x // 2) for x in donation_trend))
-    print(Fore.YELLOW + "Usage:     " + "".join("█" * (x // 2) for x in usage_trend))
+    print(Fore.MAGENTA + "Donations: " + donations_bar)
+    print(Fore.YELLOW + "Usage:     " + usage_bar)
 
     print(Fore.CYAN + "\nD=Donor | P=Patient | H=History | S=Search | U=Update | X=Delete | Q=Quit\n")
 
 # ---------------------------- Animations ----------------------------
 def animate_message(msg, color=Fore.GREEN):
+    if not ANIMATE_MESSAGES:
+        print(color + msg)
+        return
+
+    # Typewriter effect, opt-in with BMS_ANIMATE=1. init(autoreset=True)
+    # resets the colour after every write, so each character carries it.
     for ch in msg:
-        print(color + ch, end="", flush=True)
+        sys.stdout.write(color + ch)
+        sys.stdout.flush()
         time.sleep(0.02)
-    print()
+    sys.stdout.write("\n")
 
 # ---------------------------- CRUD ----------------------------
 def add_donor():
+    global _DASHBOARD_DIRTY
     print(Fore.GREEN + "\n--- Add Donor ---")
 
     name = input("Name: ").strip()
@@ -290,28 +473,26 @@ def add_donor():
 
     donor_id = generate_id("Donors")
 
-    wb = load_workbook_safe()
-    ws = wb["Donors"]
-
-    ws.append([
-        donor_id, name, contact, age,
-        blood_type, units,
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ])
+    with transaction() as wb:
+        append_row("Donors", [
+            donor_id, name, contact, age,
+            blood_type, units,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ], wb)
 
-    wb.save(DB_FILENAME)
+        update_blood_stock(blood_type, units, "add", wb)
 
-    update_blood_stock(blood_type, units, "add")
     log_history(donor_id, "Donor", name, blood_type, units, "Donated")
 
-    donation_trend.append(units)
-
-    update_excel_dashboard()
+    push_trend(donation_trend, units)
+    DAILY[day_key(datetime.now())][0] += units
+    _DASHBOARD_DIRTY = True
 
     animate_message(f"✅ Donor added! ID: {donor_id}")
 
 
 def add_patient():
+    global _DASHBOARD_DIRTY
     print(Fore.MAGENTA + "\n--- Add Patient ---")
 
     name = input("Name: ").strip()
@@ -333,35 +514,29 @@ def add_patient():
 
     patient_id = generate_id("Patients")
 
-    wb = load_workbook_safe()
-    ws = wb["Patients"]
-
-    ws.append([
-        patient_id, name, contact, age,
-        blood_type, units,
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    ])
+    with transaction() as wb:
+        append_row("Patients", [
+            patient_id, name, contact, age,
+            blood_type, units,
+            datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ], wb)
 
-    wb.save(DB_FILENAME)
+        if needs_blood == "yes":
+            update_blood_stock(blood_type, units, "subtract", wb)
 
     if needs_blood == "yes":
-        update_blood_stock(blood_type, units, "subtract")
         log_history(patient_id, "Patient", name, blood_type, units, "Needed")
-        usage_trend.append(units)
+        push_trend(usage_trend, units)
+        DAILY[day_key(datetime.now())][1] += units
+        _DASHBOARD_DIRTY = True
     else:
-        usage_trend.append(0)
-
-    update_excel_dashboard()
+        push_trend(usage_trend, 0)
 
     animate_message(f"✅ Patient added! ID: {patient_id}")
 
 
 def view_sheet(sheet):
-    wb = load_workbook_safe()
-    ws = wb[sheet]
-
-    headers = [cell.value for cell in ws[1]]
-    data = [list(row) for row in ws.iter_rows(min_row=2, values_only=True)]
+    headers, data = read_history() if sheet == "History" else read_sheet(sheet)
 
     print(Fore.CYAN + f"=== {sheet} ===")
     print(Fore.YELLOW + tabulate(data, headers=headers, tablefmt="fancy_grid"))
@@ -377,16 +552,14 @@ def search_record():
         return
 
     query = input("Enter Name, ID, or Blood Type: ").lower()
+    pattern = re.compile(re.escape(query))
 
-    wb = load_workbook_safe()
-    ws = wb[sheet]
-
-    headers = [cell.value for cell in ws[1]]
-    results = []
+    headers, data = read_sheet(sheet)
 
-    for row in ws.iter_rows(min_row=2, values_only=True):
-        if any(query in str(col).lower() for col in row):
-            results.append(list(row))
+    # One lowercased string per row, scanned once, instead of a lower() and
+    # substring test per cell
+    rows = [(row, "\t".join(map(str, row)).lower()) for row in data]
+    results = [list(row) for row, joined in rows if pattern.search(joined)]
 
     if results:
         print(tabulate(results, headers=headers, tablefmt="fancy_grid"))
@@ -405,20 +578,21 @@ def update_record():
 
     record_id = input(f"Enter {sheet[:-1]} ID: ").strip()
 
-    wb = load_workbook_safe()
-    ws = wb[sheet]
+    updated = False
 
-    for row in ws.iter_rows(min_row=2):
-        if str(row[0].value) == record_id:
-            row[1].value = input(f"Name [{row[1].value}]: ") or row[1].value
-            row[2].value = input(f"Contact [{row[2].value}]: ") or row[2].value
-            row[3].value = int(input(f"Age [{row[3].value}]: ") or row[3].value)
+    with transaction() as wb:
+        ws = wb[sheet]
 
-            wb.save(DB_FILENAME)
-            update_excel_dashboard()
+        for row in ws.iter_rows(min_row=2):
+            if str(row[0].value) == record_id:
+                row[1].value = input(f"Name [{row[1].value}]: ") or row[1].value
+                row[2].value = input(f"Contact [{row[2].value}]: ") or row[2].value
+                row[3].value = int(input(f"Age [{row[3].value}]: ") or row[3].value)
+                updated = True
+                break
 
-            animate_message("✔ Record updated!")
-            break
+    if updated:
+        animate_message("✔ Record updated!")
     else:
         animate_message("❌ Not found.", Fore.RED)
 
@@ -434,41 +608,74 @@ def delete_record():
 
     record_id = input(f"Enter {sheet[:-1]} ID: ").strip()
 
-    wb = load_workbook_safe()
-    ws = wb[sheet]
+    deleted = False
 
-    for row in ws.iter_rows(min_row=2):
-        if str(row[0].value) == record_id:
-            ws.delete_rows(row[0].row)
-            wb.save(DB_FILENAME)
-            update_excel_dashboard()
+    with transaction() as wb:
+        ws = wb[sheet]
 
-            animate_message("✔ Record deleted!")
-            break
+        for row in ws.iter_rows(min_row=2):
+            if str(row[0].value) == record_id:
+                ws.delete_rows(row[0].row)
+                deleted = True
+                break
+
+    if deleted:
+        animate_message("✔ Record deleted!")
     else:
         animate_message("❌ Not found.", Fore.RED)
 
     input("Press Enter...")
 
 # ---------------------------- Live Dashboard Loop ----------------------------
-def live_dashboard():
-    try:
-        while True:
-            display_live_dashboard()
+STD_INPUT_HANDLE = -10
+WAIT_OBJECT_0 = 0
+
+kernel32 = ctypes.windll.kernel32
+
 
-            start = time.time()
+def wait_for_key(timeout):
+    # Block on the console input handle instead of polling kbhit() in a loop
+    stdin = kernel32.GetStdHandle(STD_INPUT_HANDLE)
+    deadline = time.time() + timeout
 
-            while time.time() - start < DASHBOARD_REFRESH_SECONDS:
-                if msvcrt.kbhit():
-                    key = msvcrt.getch().decode().lower()
+    while not msvcrt.kbhit():
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return None
 
-                    if key == "d": add_donor(); break
-                    if key == "p": add_patient(); break
-                    if key == "h": view_sheet("History"); break
-                    if key == "s": search_record(); break
-                    if key == "u": update_record(); break
-                    if key == "x": delete_record(); break
-                    if key == "q": return
+        signaled = kernel32.WaitForSingleObject(stdin, int(remaining * 1000)) == WAIT_OBJECT_0
+        if signaled and not msvcrt.kbhit():
+            # Mouse, focus and key-up events also signal the handle; drop them
+            # so the next wait blocks again
+            kernel32.FlushConsoleInputBuffer(stdin)
+
+    return msvcrt.getch().decode().lower()
+
+
+def live_dashboard():
+    last_rendered = None
+
+    try:
+        while True:
+            refresh_excel_dashboard()
+
+            # Redraw only when stock or trends changed since the last frame
+            state = (tuple(STOCK[b] for b in BLOOD_TYPES), _trend_head)
+            if state != last_rendered:
+                display_live_dashboard()
+                last_rendered = state
+
+            key = wait_for_key(DASHBOARD_REFRESH_SECONDS)
+            if key is not None:
+                last_rendered = None  # the action below draws over the dashboard
+
+            if key == "d": add_donor()
+            elif key == "p": add_patient()
+            elif key == "h": view_sheet("History")
+            elif key == "s": search_record()
+            elif key == "u": update_record()
+            elif key == "x": delete_record()
+            elif key == "q": return
 
     except KeyboardInterrupt:
         return
@@ -476,9 +683,10 @@ def live_dashboard():
 # ---------------------------- Main ----------------------------
 def main():
     initialize_database()
+    load_state()
 
     while True:
-        os.system('cls')
+        clear_screen()
         print_banner()
 
         print(Fore.YELLOW + """
@@ -503,6 +711,7 @@ def main():
         elif choice == "6": view_sheet("History")
         elif choice == "7": live_dashboard()
         elif choice == "8":
+            refresh_excel_dashboard()
             animate_message("Goodbye!", Fore.GREEN)
             break
         else:
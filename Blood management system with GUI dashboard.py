@@ -1,14 +1,19 @@
 import sys
 import os
+import csv
+from itertools import islice
 from datetime import datetime, date
-from collections import defaultdict
 
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QTableWidget, QTableWidgetItem, QLineEdit, QMessageBox,
-    QDialog, QFormLayout, QSpinBox, QComboBox, QProgressBar, QGridLayout
+    QDialog, QFormLayout, QSpinBox, QComboBox, QProgressBar, QGridLayout,
+    QProgressDialog, QInputDialog
+)
+from PyQt5.QtCore import (
+    Qt, QTimer, QPropertyAnimation, QEasingCurve, QThread, pyqtSignal, QFileSystemWatcher,
+    QParallelAnimationGroup, QAbstractAnimation
 )
-from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve
 from PyQt5.QtGui import QFont
 import openpyxl
 from fpdf import FPDF
@@ -23,7 +28,8 @@ from matplotlib.figure import Figure
 PATIENT_FILE = "patients.xlsx"
 DONOR_FILE = "donors.xlsx"
 STOCK_FILE = "blood_stock.xlsx"
-HISTORY_FILE = "history.xlsx"
+HISTORY_FILE = "history.csv"  # append-only; see append_history()
+OLD_HISTORY_FILE = "history.xlsx"  # migrated into HISTORY_FILE by init_history()
 
 # Define low-stock thresholds per blood type
 LOW_STOCK_THRESHOLDS = {
@@ -35,6 +41,21 @@ LOW_STOCK_THRESHOLDS = {
 
 MAX_STOCK = 100  # Maximum on progress bars for visualization
 
+# Workbooks opened by the current UI action, saved together by flush_excel()
+_wb_cache = {}
+
+# Parsed rows per file (the CSV history included): path -> rows; see load_excel_cached()
+_XLSX_CACHE = {}
+
+# Data rows per file, for files not parsed into _XLSX_CACHE; see count_rows()
+_ROW_COUNTS = {}
+
+# (history rows, {"YYYY-MM-DD": [donated, used]}) last built by daily_totals()
+_DAILY_CACHE = (None, {})
+
+# path -> (rows, lowercased text of each data row); see search_index()
+_SEARCH_INDEX = {}
+
 # ---------------------------- Excel Setup ----------------------------
 def init_excel(filename, headers):
     if not os.path.exists(filename):
@@ -43,12 +64,26 @@ def init_excel(filename, headers):
         ws.append(headers)
         wb.save(filename)
 
+def init_history(headers):
+    # History used to be a workbook; the first run copies its rows over
+    if os.path.exists(HISTORY_FILE):
+        return
+    rows = [headers]
+    if os.path.exists(OLD_HISTORY_FILE):
+        wb = openpyxl.load_workbook(OLD_HISTORY_FILE, read_only=True, data_only=True)
+        rows = list(wb.active.iter_rows(values_only=True))
+        wb.close()
+    tmp = HISTORY_FILE + ".tmp"
+    with open(tmp, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+    os.replace(tmp, HISTORY_FILE)
+
 # Initialize files
 init_excel(PATIENT_FILE, ["ID", "Name", "Age", "Blood Type", "Disease", "Date"])
 init_excel(DONOR_FILE, ["ID", "Name", "Age", "Blood Type", "Last Donation Date"])
 init_excel(STOCK_FILE, ["Blood Type", "Quantity"])
 # HISTORY_FILE has 6 columns
-init_excel(HISTORY_FILE, ["DateTime", "Action", "Type", "Name", "BloodType", "Quantity"])
+init_history(["DateTime", "Action", "Type", "Name", "BloodType", "Quantity"])
 
 def load_excel(file):
     wb = openpyxl.load_workbook(file)
@@ -56,18 +91,133 @@ def load_excel(file):
     # IMPORTANT: The load_excel function returns everything, including the header row.
     return [list(row) for row in ws.iter_rows(values_only=True)]
 
+def load_csv(file):
+    with open(file, newline="", encoding="utf-8") as f:
+        return list(csv.reader(f))
+
+def iter_csv(file):
+    # Yield rows one at a time, header first
+    with open(file, newline="", encoding="utf-8") as f:
+        yield from csv.reader(f)
+
+def iter_excel(file):
+    # Yield rows one at a time from a read-only load, header first
+    wb = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for row in wb.active.iter_rows(values_only=True):
+            yield row
+    finally:
+        wb.close()
+
+def load_excel_cached(file):
+    # Reparse only after the entry has been dropped, either by our own writes
+    # or by the file watcher in BloodManagementSystem. The rows are shared
+    # between callers, so they must not be modified; use load_excel() to edit
+    # a copy.
+    rows = _XLSX_CACHE.get(file)
+    if rows is None:
+        load = load_csv if file.endswith(".csv") else load_excel
+        rows = _XLSX_CACHE[file] = load(file)
+    return rows
+
+def count_rows(file):
+    # Number of data rows (header excluded). Uses the parsed rows when they
+    # are cached; otherwise reads only the sheet dimensions, not cell values.
+    rows = _XLSX_CACHE.get(file)
+    if rows is not None:
+        return len(rows) - 1
+    n = _ROW_COUNTS.get(file)
+    if n is None:
+        wb = openpyxl.load_workbook(file, read_only=True)
+        try:
+            ws = wb.active
+            if ws.max_row is None:
+                ws.calculate_dimension(force=True)
+            n = _ROW_COUNTS[file] = max(0, ws.max_row - 1)
+        finally:
+            wb.close()
+    return n
+
+def append_history(row):
+    # Appending a line leaves the rest of the file untouched
+    with open(HISTORY_FILE, "a", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerow(row)
+    invalidate(HISTORY_FILE)
+
+def invalidate(file):
+    # Forget everything cached about a file after it has been written
+    _XLSX_CACHE.pop(file, None)
+    _ROW_COUNTS.pop(file, None)
+
 def save_excel(file, data):
-    wb = openpyxl.Workbook()
-    ws = wb.active
+    # Stream the rows out and swap the file in only once it is complete
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
     for row in data:
         ws.append(row)
-    wb.save(file)
+    tmp = file + ".tmp"
+    wb.save(tmp)
+    os.replace(tmp, file)
+    invalidate(file)
+
+def open_excel(file):
+    # Load each file at most once per UI action
+    wb = _wb_cache.get(file)
+    if wb is None:
+        wb = _wb_cache[file] = openpyxl.load_workbook(file)
+    return wb.active
 
 def append_excel(file, row):
-    wb = openpyxl.load_workbook(file)
-    ws = wb.active
-    ws.append(row)
-    wb.save(file)
+    # Changes are kept in memory until flush_excel()
+    open_excel(file).append(row)
+
+def flush_excel():
+    for file, wb in _wb_cache.items():
+        wb.save(file)
+        invalidate(file)
+    _wb_cache.clear()
+
+def search_index(file):
+    # Searchable text for every data row, rebuilt only when the file has been
+    # reparsed; cells are tab-joined so a query cannot span two of them
+    data = load_excel_cached(file)
+    hit = _SEARCH_INDEX.get(file)
+    if hit is None or hit[0] is not data:
+        hit = _SEARCH_INDEX[file] = (data, ["\t".join(map(str, row)).lower() for row in data[1:]])
+    return hit
+
+def daily_totals():
+    # Donated/used units per day, grouped in one pass and rebuilt only when
+    # HISTORY_FILE has been reparsed
+    global _DAILY_CACHE
+    hist = load_excel_cached(HISTORY_FILE)
+    if _DAILY_CACHE[0] is hist:
+        return _DAILY_CACHE[1]
+
+    totals = {}
+    slot = {"Add Donor": 0, "Add Patient": 1}
+    for row in hist[1:]:
+        # Check for exactly 6 elements before unpacking (robustness)
+        if len(row) != 6:
+            continue
+        dt_str, action, typ, name, btype, qty = row
+        idx = slot.get(action)
+        if idx is None or not isinstance(dt_str, str):
+            continue
+        try:
+            quantity = int(qty)
+        except:
+            continue
+        # Only the date is needed, so slice it off rather than parsing the
+        # timestamp; fromisoformat() runs once per day in update_plot()
+        key = dt_str[:10]
+        day = totals.get(key)
+        if day is None:
+            day = totals[key] = [0, 0]
+        day[idx] += quantity
+
+    _DAILY_CACHE = (hist, totals)
+    return totals
 
 # ---------------------------- Animated Stock Bar ----------------------------
 class AnimatedStockBar(QWidget):
@@ -82,7 +232,8 @@ class AnimatedStockBar(QWidget):
         self.progress = QProgressBar()
         self.progress.setMaximum(self.max_quantity)
         self.progress.setValue(quantity)
-        self.progress.setStyleSheet(self.get_style(quantity))
+        self._style = self.get_style(quantity)
+        self.progress.setStyleSheet(self._style)
         self.layout.addWidget(self.label)
         self.layout.addWidget(self.progress)
         self.setLayout(self.layout)
@@ -117,17 +268,21 @@ class AnimatedStockBar(QWidget):
                 }
             """
 
-    def animate_to(self, new_value):
+    def animation_to(self, new_value):
+        # Relabel for new_value and return the animation towards it, not yet
+        # started so callers can run several bars as one group
         anim = QPropertyAnimation(self.progress, b"value", self)
         anim.setDuration(800)
         anim.setStartValue(self.progress.value())
         anim.setEndValue(new_value)
         anim.setEasingCurve(QEasingCurve.Type.InOutQuad)
-        anim.start()
-        self.progress.setStyleSheet(self.get_style(new_value))
+        # Restyling is costly, so only do it when the colour changes
+        style = self.get_style(new_value)
+        if style != self._style:
+            self._style = style
+            self.progress.setStyleSheet(style)
         self.label.setText(f"{self.blood_type}: {new_value} units")
-        # Keep a reference to prevent garbage collection
-        self._anim = anim
+        return anim
 
 # ---------------------------- Trend Graph Canvas ----------------------------
 class TrendCanvas(FigureCanvas):
@@ -141,37 +296,19 @@ class TrendCanvas(FigureCanvas):
         self.axes.set_ylabel("Units")
         fig.tight_layout()
 
-    def update_plot(self, history_data):
-        # history_data: list of rows from HISTORY_FILE
-        daily = defaultdict(lambda: {"donated": 0, "used": 0})
-        
-        # Start iteration from the second row to skip the header
-        for row in history_data[1:]:
-            # Check for exactly 6 elements before unpacking (robustness)
-            if len(row) != 6:
-                print(f"Skipping malformed history row with length {len(row)}: {row}")
-                continue
-                
-            # Unpacking 6 elements from a row with 6 columns
-            dt_str, action, typ, name, btype, qty = row
-            
+    def update_plot(self, daily):
+        # daily: {"YYYY-MM-DD": [donated, used]} as built by daily_totals(),
+        # so the plot gets one point per day rather than one per history row
+        days, donated, used = [], [], []
+        for key in sorted(daily.keys()):
             try:
-                dt = datetime.fromisoformat(dt_str)
-                d = dt.date()
-                quantity = int(qty)
-            except Exception:
-                # Skip rows with malformed dates or quantities
+                d = date.fromisoformat(key)
+            except ValueError:
+                # Skip rows with malformed dates
                 continue
-            
-            if action == "Add Donor":
-                daily[d]["donated"] += quantity
-            elif action == "Add Patient":
-                daily[d]["used"] += quantity
-
-        # Sort days
-        days = sorted(daily.keys())
-        donated = [daily[d]["donated"] for d in days]
-        used = [daily[d]["used"] for d in days]
+            days.append(d)
+            donated.append(daily[key][0])
+            used.append(daily[key][1])
 
         self.axes.clear()
         if days:
@@ -185,6 +322,73 @@ class TrendCanvas(FigureCanvas):
             self.axes.text(0.5, 0.5, "No data", horizontalalignment='center', verticalalignment='center')
         self.draw()
 
+# ---------------------------- PDF Report ----------------------------
+def build_pdf(header_row, rows, stock, title, filename):
+    pdf = FPDF()
+    pdf.set_auto_page_break(auto=True, margin=15)
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 16)
+    pdf.cell(0, 10, title, align="C")
+    pdf.ln()
+    pdf.ln(5)
+    pdf.set_font("helvetica", size=10) # Reduced font size for better fit
+
+    # Print data, excluding the header row
+    if header_row:
+        headers = [str(h) for h in header_row]
+        # Determine appropriate column width (simple uniform example)
+        width = 190 / len(headers)
+
+        # Table headers; fill and font are set once, not per cell
+        pdf.set_fill_color(200, 220, 255)
+        pdf.set_font("helvetica", "B", 10)
+        for header in headers:
+            pdf.cell(width, 7, header, border=1, align="C", fill=True)
+        pdf.ln()
+
+        # Table rows
+        pdf.set_font("helvetica", size=10)
+        cell = pdf.cell
+        ln = pdf.ln
+        w = width
+        for row in rows:
+            # Convert the row once; str() hands CSV values back unchanged
+            cells = list(map(str, row))
+            for text in cells:
+                cell(w, 6, text, border=1, align="L")
+            ln()
+
+    # Add trend summary
+    pdf.add_page()
+    pdf.set_font("helvetica", "B", 14)
+    pdf.cell(0, 10, "Blood Stock & Usage Summary")
+    pdf.ln()
+    pdf.ln(3)
+    pdf.set_font("helvetica", size=12)
+    for row in stock:
+        bt, qty = row
+        pdf.cell(0, 8, f"{bt}: {qty} units")
+        pdf.ln()
+
+    pdf.output(filename)
+
+class PdfWorker(QThread):
+    # Runs build_pdf() off the GUI thread so long reports don't freeze the window
+    done = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, header_row, rows, stock, title, filename, parent=None):
+        super().__init__(parent)
+        self.args = (header_row, rows, stock, title, filename)
+
+    def run(self):
+        try:
+            build_pdf(*self.args)
+        except Exception as e:
+            self.failed.emit(str(e))
+        else:
+            self.done.emit(self.args[-1])
+
 # ---------------------------- Main Application ----------------------------
 class BloodManagementSystem(QWidget):
     def __init__(self):
@@ -220,7 +424,12 @@ class BloodManagementSystem(QWidget):
         # Search bar
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Search by Name / Blood Type...")
-        self.search_input.textChanged.connect(self.update_search)
+        # Debounce: filter once typing pauses for 150 ms, not on every keystroke
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(self.update_search)
+        self.search_input.textChanged.connect(self._search_timer.start)
         self.layout.addWidget(self.search_input)
 
         # Main Table
@@ -242,6 +451,9 @@ class BloodManagementSystem(QWidget):
             row = i // 4
             col = i % 4
             self.stock_grid.addWidget(bar, row, col)
+        # Target quantity per bar; the bars themselves may still be animating
+        self.stock_levels = dict.fromkeys(self.stock_bars, 0)
+        self._last_stock_snapshot = None
 
         # Metrics panel (labels)
         self.metrics_layout = QHBoxLayout()
@@ -271,8 +483,41 @@ class BloodManagementSystem(QWidget):
         self.timer.start(2000)  # refresh every 2 seconds
 
         self.current_view = None
+        # (view, query, rows) the table was last filtered from; rows are
+        # compared by identity so a reloaded file still repopulates
+        self._last_filter_sig = None
+        self._pdf_worker = None
+        self._plotted_daily = None
+
+        # Drop cached rows when a file is changed outside this window. The
+        # directory is watched too, so a file that was deleted and renamed
+        # back into place (how many editors save) is picked up again.
+        self._data_files = [PATIENT_FILE, DONOR_FILE, HISTORY_FILE, STOCK_FILE]
+        self._missing = set()  # data files the watcher saw disappear
+        self._fsw = QFileSystemWatcher(self._data_files, self)
+        self._fsw.addPath(os.path.dirname(os.path.abspath(PATIENT_FILE)))
+        self._fsw.fileChanged.connect(self._file_changed)
+        self._fsw.directoryChanged.connect(self._dir_changed)
         self.refresh_dashboard()
 
+    def _file_changed(self, path):
+        invalidate(path)
+        # Saving through a temp file replaces the file, which stops the watch
+        if not os.path.exists(path):
+            self._missing.add(path)
+        elif path not in self._fsw.files():
+            self._fsw.addPath(path)
+
+    def _dir_changed(self, _):
+        # A data file that dropped out of the watch while it was missing may
+        # have come back with new contents
+        watched = self._fsw.files()
+        for path in self._data_files:
+            if path not in watched and os.path.exists(path):
+                self._fsw.addPath(path)
+                invalidate(path)
+                self._missing.discard(path)
+
     # ---------------------------- CRUD: Add Patient / Donor ----------------------------
     def add_patient(self):
         dialog = QDialog(self)
@@ -315,12 +560,13 @@ class BloodManagementSystem(QWidget):
 
             save_excel(STOCK_FILE, stock)
 
-            pdata = load_excel(PATIENT_FILE)
-            new_id = len(pdata)
+            # max_row counts the header, so it is the next ID
+            new_id = open_excel(PATIENT_FILE).max_row
             row = [new_id, name, age_input.value(), bt, disease_input.text(), datetime.now().strftime('%Y-%m-%d')] # Changed to YYYY-MM-DD for simpler viewing
             append_excel(PATIENT_FILE, row)
+            flush_excel()
             # Append 6 values to HISTORY_FILE
-            append_excel(HISTORY_FILE, [datetime.now().isoformat(), "Add Patient", "Patient", name, bt, 1])
+            append_history([datetime.now().isoformat(), "Add Patient", "Patient", name, bt, 1])
 
             QMessageBox.information(dialog, "Success", "Patient Added (Blood usage recorded).")
             dialog.close()
@@ -368,12 +614,13 @@ class BloodManagementSystem(QWidget):
                 stock.append([bt, 1])
             save_excel(STOCK_FILE, stock)
 
-            ddata = load_excel(DONOR_FILE)
-            new_id = len(ddata)
+            # max_row counts the header, so it is the next ID
+            new_id = open_excel(DONOR_FILE).max_row
             row = [new_id, name, age_input.value(), bt, last_donation_input.text()]
             append_excel(DONOR_FILE, row)
+            flush_excel()
             # Append 6 values to HISTORY_FILE
-            append_excel(HISTORY_FILE, [datetime.now().isoformat(), "Add Donor", "Donor", name, bt, 1])
+            append_history([datetime.now().isoformat(), "Add Donor", "Donor", name, bt, 1])
 
             QMessageBox.information(dialog, "Success", "Donor Added (Stock updated).")
             dialog.close()
@@ -385,20 +632,21 @@ class BloodManagementSystem(QWidget):
     # ---------------------------- View (Patients, Donors, History) ----------------------------
     def view_patients(self):
         self.current_view = "patient"
-        self.populate_table(load_excel(PATIENT_FILE))
+        self.populate_table(load_excel_cached(PATIENT_FILE))
 
     def view_donors(self):
         self.current_view = "donor"
-        self.populate_table(load_excel(DONOR_FILE))
+        self.populate_table(load_excel_cached(DONOR_FILE))
 
     def view_history(self):
         self.current_view = "history"
-        self.populate_table(load_excel(HISTORY_FILE))
+        self.populate_table(load_excel_cached(HISTORY_FILE))
 
     # ---------------------------- Table population & Search ----------------------------
     def populate_table(self, data):
-        self.table.clear()
+        self._last_filter_sig = None
         if not data:
+            self.table.clear()
             self.table.setRowCount(0)
             self.table.setColumnCount(0)
             return
@@ -406,30 +654,60 @@ class BloodManagementSystem(QWidget):
         headers = data[0]
         rows = data[1:]
 
+        # Suspend repaints, signals and sorting while filling so the table
+        # lays itself out once instead of after every cell
+        sorting = self.table.isSortingEnabled()
+        self.table.setUpdatesEnabled(False)
+        self.table.blockSignals(True)
+        self.table.setSortingEnabled(False)
+
         self.table.setRowCount(len(rows))
         self.table.setColumnCount(len(headers))
         self.table.setHorizontalHeaderLabels([str(h) for h in headers])
 
+        # Cells that survive the resize keep their items and only get new
+        # text; items are created just for cells that don't have one yet
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        item_at = self.table.item
+        set_item = self.table.setItem
+        columns = len(headers)
         for i, row in enumerate(rows):
             for j, val in enumerate(row):
-                item = QTableWidgetItem(str(val))
-                item.setFlags(Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled)
-                self.table.setItem(i, j, item)
+                item = item_at(i, j)
+                if item is None:
+                    item = QTableWidgetItem(str(val))
+                    item.setFlags(flags)
+                    set_item(i, j, item)
+                else:
+                    item.setText(str(val))
+            # A short row must not show the previous contents of its tail
+            for j in range(len(row), columns):
+                item = item_at(i, j)
+                if item is not None:
+                    item.setText("")
         self.table.resizeColumnsToContents()
 
+        self.table.setSortingEnabled(sorting)
+        self.table.blockSignals(False)
+        self.table.setUpdatesEnabled(True)
+
 
     def update_search(self):
         if not self.current_view:
             return
         query = self.search_input.text().lower()
-        data = []
+        data, texts = [], []
         if self.current_view == "patient":
-            data = load_excel(PATIENT_FILE)
+            data, texts = search_index(PATIENT_FILE)
         elif self.current_view == "donor":
-            data = load_excel(DONOR_FILE)
+            data, texts = search_index(DONOR_FILE)
         elif self.current_view == "history":
-            data = load_excel(HISTORY_FILE)
+            data, texts = search_index(HISTORY_FILE)
             
+        last = self._last_filter_sig
+        if last and last[0] == self.current_view and last[1] == query and last[2] is data:
+            return
+
         if not data:
              self.populate_table([])
              return
@@ -438,142 +716,157 @@ class BloodManagementSystem(QWidget):
         headers = data[0]
         data_rows = data[1:]
         
-        filtered_rows = [row for row in data_rows if any(query in str(cell).lower() for cell in row)]
+        # Typing on extends the query, and a longer query can only match rows
+        # the shorter one did, so rescan just those
+        if last and last[0] == self.current_view and last[2] is data and last[1] in query:
+            matches = [i for i in self._filter_matches if query in texts[i]]
+        else:
+            matches = [i for i, text in enumerate(texts) if query in text]
+        filtered_rows = [data_rows[i] for i in matches]
         
         # Repack the filtered data with headers for population
         self.populate_table([headers] + filtered_rows)
+        self._last_filter_sig = (self.current_view, query, data)
+        self._filtered = (headers, filtered_rows)
+        self._filter_matches = matches
 
     # ---------------------------- Dashboard Refresh ----------------------------
     def refresh_dashboard(self):
+        # A file saved by delete-and-rename is briefly missing. Say so rather
+        # than failing, and refresh again once the watcher sees it return.
+        # OSError covers the moment before the watcher has reported it.
+        if self._missing:
+            self._show_missing(self._missing)
+            return
+        try:
+            self._refresh_dashboard()
+        except OSError as e:
+            self._show_missing([e.filename or str(e)])
+
+    def _show_missing(self, files):
+        self.alerts_label.setText("⚠ Cannot read " + ", ".join(sorted(files)) + "; waiting for it to come back.")
+        self.alerts_label.setStyleSheet("color: red;")
+        # Rebuild the stock alert once the files can be read again
+        self._last_stock_snapshot = None
+
+    def _refresh_dashboard(self):
         # Refresh stock bars
-        stock_data = load_excel(STOCK_FILE)
+        stock_data = load_excel_cached(STOCK_FILE)
         if len(stock_data) == 1:
-            # only header, initialize
-            for bt in self.stock_bars:
-                append_excel(STOCK_FILE, [bt, 0])
-            stock_data = load_excel(STOCK_FILE)
+            # only header, initialize in one write and use these rows directly
+            stock_data = [stock_data[0]] + [[bt, 0] for bt in self.stock_bars]
+            save_excel(STOCK_FILE, stock_data)
 
-        for row in stock_data[1:]:
-            bt, qty = row
-            if bt in self.stock_bars:
-                self.stock_bars[bt].animate_to(qty)
+        self.animate_stock(dict(stock_data[1:]))
 
         # Update counters
-        # Subtract 1 for the header row
-        total_patients = len(load_excel(PATIENT_FILE)) - 1
-        total_donors = len(load_excel(DONOR_FILE)) - 1
+        total_patients = count_rows(PATIENT_FILE)
+        total_donors = count_rows(DONOR_FILE)
         self.patient_counter.setText(f"Total Patients: {total_patients}")
         self.donor_counter.setText(f"Total Donors: {total_donors}")
 
         # Daily donations / usage
-        today = date.today()
-        hist = load_excel(HISTORY_FILE)
-        donated = 0
-        used = 0
-        for row in hist[1:]:
-            # Check for exactly 6 elements before unpacking (robustness)
-            if len(row) != 6:
-                continue
-                
-            # FIX: The original code used 4 placeholders, but history has 6 columns
-            # The correct unpacking for all 6 columns, ignoring the 3rd, 4th, 5th, is:
-            dt_str, action, typ, name, btype, qty = row
-            
-            try:
-                dt = datetime.fromisoformat(dt_str)
-                quantity = int(qty)
-            except:
-                continue
-            
-            if dt.date() == today:
-                if action == "Add Donor":
-                    donated += quantity
-                elif action == "Add Patient":
-                    used += quantity
+        daily = daily_totals()
+        donated, used = daily.get(date.today().isoformat(), (0, 0))
         
         self.daily_don_label.setText(f"Today’s Donations: {donated}")
         self.daily_use_label.setText(f"Today’s Usage: {used}")
 
-        # Alerts summary
-        alerts = []
-        for bt, bar in self.stock_bars.items():
-            qty = bar.progress.value()
-            if qty <= LOW_STOCK_THRESHOLDS.get(bt, 0):
-                alerts.append(f"{bt} low ({qty})")
-        if alerts:
-            self.alerts_label.setText("⚠ Low stock: " + ", ".join(alerts))
-            self.alerts_label.setStyleSheet("color: red;")
+        # Alerts summary, rebuilt only when a stock level has changed
+        snapshot = tuple(self.stock_levels.items())
+        if snapshot != self._last_stock_snapshot:
+            self._last_stock_snapshot = snapshot
+            alerts = []
+            for bt, qty in snapshot:
+                if qty <= LOW_STOCK_THRESHOLDS.get(bt, 0):
+                    alerts.append(f"{bt} low ({qty})")
+            if alerts:
+                self.alerts_label.setText("⚠ Low stock: " + ", ".join(alerts))
+                self.alerts_label.setStyleSheet("color: red;")
+            else:
+                self.alerts_label.setText("All blood types stock is healthy.")
+                self.alerts_label.setStyleSheet("color: green;")
+
+        # Update trend graph; daily_totals() returns the same dict until the
+        # history changes, so an unchanged history is not redrawn
+        if daily is not self._plotted_daily:
+            self.trend_canvas.update_plot(daily)
+            self._plotted_daily = daily
+
+    def animate_stock(self, levels):
+        # Move every bar whose quantity changed in one animation group; bars
+        # that are already at their level are left alone
+        group = QParallelAnimationGroup(self)
+        for bt, qty in levels.items():
+            if bt in self.stock_bars and self.stock_levels[bt] != qty:
+                group.addAnimation(self.stock_bars[bt].animation_to(qty))
+                self.stock_levels[bt] = qty
+        if group.animationCount():
+            group.start(QAbstractAnimation.DeletionPolicy.DeleteWhenStopped)
         else:
-            self.alerts_label.setText("All blood types stock is healthy.")
-            self.alerts_label.setStyleSheet("color: green;")
-
-        # Update trend graph
-        self.trend_canvas.update_plot(hist)
+            group.deleteLater()
 
     # ---------------------------- PDF Export ----------------------------
     def export_pdf(self):
         if not self.current_view:
             QMessageBox.warning(self, "Error", "Please view Patients, Donors or History first.")
             return
-        data = []
+        if self._pdf_worker is not None and self._pdf_worker.isRunning():
+            return
+        limit, ok = QInputDialog.getInt(self, "Export PDF Report", "Maximum rows (0 for all):", 0, 0, 1000000)
+        if not ok:
+            return
+
+        file = ""
         title = ""
         if self.current_view == "patient":
-            data = load_excel(PATIENT_FILE)
+            file = PATIENT_FILE
             title = "Patient Report"
         elif self.current_view == "donor":
-            data = load_excel(DONOR_FILE)
+            file = DONOR_FILE
             title = "Donor Report"
         elif self.current_view == "history":
-            data = load_excel(HISTORY_FILE)
+            file = HISTORY_FILE
             title = "History Report"
 
-        pdf = FPDF()
-        pdf.set_auto_page_break(auto=True, margin=15)
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 16)
-        pdf.cell(0, 10, txt=title, ln=True, align="C")
-        pdf.ln(5)
-        pdf.set_font("Arial", size=10) # Reduced font size for better fit
-
-        # Print data, excluding the header row
-        if data:
-            # Table headers
-            pdf.set_fill_color(200, 220, 255)
-            pdf.set_font("Arial", "B", 10)
-            
-            col_widths = [20, 40, 15, 20, 30, 45] # Adjusted widths for 6 columns
+        # Export what the table shows: apply a search still waiting on the
+        # debounce, then reuse its rows if the table holds a search result
+        if self._search_timer.isActive():
+            self._search_timer.stop()
+            self.update_search()
+        if self._last_filter_sig and self.search_input.text():
+            header_row, rows = self._filtered
+            rows = iter(rows)
+        else:
+            # Rows are streamed from the file so only one is held at a time
+            rows = iter_csv(file) if file.endswith(".csv") else iter_excel(file)
+            header_row = next(rows, None)
+        if limit:
+            rows = islice(rows, limit)
+
+        # The stock summary is small, so read it here rather than touching the
+        # shared cache from the worker thread
+        stock = load_excel_cached(STOCK_FILE)[1:]
+        filename = f"{title.replace(' ', '_').replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
 
-            headers = [str(h) for h in data[0]]
-            # Determine appropriate column width (simple uniform example)
-            width = 190 / len(headers) 
-            
-            # Print Headers
-            for i, header in enumerate(headers):
-                pdf.cell(width, 7, header, 1, 0, 'C', 1)
-            pdf.ln()
-
-            # Table rows
-            pdf.set_font("Arial", size=10)
-            for row in data[1:]:
-                for i, val in enumerate(row):
-                    pdf.cell(width, 6, str(val), 1, 0, 'L')
-                pdf.ln()
-
-        # Add trend summary
-        pdf.add_page()
-        pdf.set_font("Arial", "B", 14)
-        pdf.cell(0, 10, txt="Blood Stock & Usage Summary", ln=True)
-        pdf.ln(3)
-        pdf.set_font("Arial", size=12)
-        stock = load_excel(STOCK_FILE)
-        for row in stock[1:]:
-            bt, qty = row
-            pdf.cell(0, 8, txt=f"{bt}: {qty} units", ln=True)
+        self._pdf_progress = QProgressDialog(f"Generating {title}...", None, 0, 0, self)
+        self._pdf_progress.setWindowTitle("Export PDF Report")
+        self._pdf_progress.setWindowModality(Qt.WindowModality.WindowModal)
+        self._pdf_progress.show()
 
-        filename = f"{title.replace(' ', '_').replace('/', '_')}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-        pdf.output(filename)
+        self._pdf_worker = PdfWorker(header_row, rows, stock, title, filename, self)
+        self._pdf_worker.done.connect(self._pdf_done)
+        self._pdf_worker.failed.connect(self._pdf_failed)
+        self._pdf_worker.start()
+
+    def _pdf_done(self, filename):
+        self._pdf_progress.close()
         QMessageBox.information(self, "Success", f"Report saved to {filename}")
 
+    def _pdf_failed(self, error):
+        self._pdf_progress.close()
+        QMessageBox.warning(self, "Error", f"Could not export the report: {error}")
+
 # ---------------------------- Run Application ----------------------------
 if __name__ == "__main__":
     app = QApplication(sys.argv)